@@ -11,20 +11,37 @@ Features:
 - Cross-origin support for web frontend
 """
 
-import json
+import gzip
+from collections import defaultdict
+from contextlib import asynccontextmanager
 from pathlib import Path
-from typing import List, Optional
+from typing import Annotated, List, Optional, Tuple
 
-from fastapi import FastAPI, HTTPException
+import numpy as np
+import orjson
+from fastapi import BackgroundTasks, FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, ConfigDict, Field
+from starlette.datastructures import Headers
 from .tariff_service import TariffUpdateService
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Release the tariff service's HTTP connections on shutdown."""
+    yield
+    await tariff_service.aclose()
+
+
 # Initialize FastAPI application
 app = FastAPI(
     title="Tariff Tracker API",
     description="API for calculating tariff impacts on consumer prices",
     version="1.0.0",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan,
 )
 
 # Configure CORS middleware for frontend access
@@ -40,14 +57,51 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+def _accepts_gzip(accept_encoding: str) -> bool:
+    """Check whether an Accept-Encoding header allows gzip, honoring q-values."""
+    wildcard_q = None
+    for entry in accept_encoding.lower().split(","):
+        coding, *params = entry.split(";")
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        coding = coding.strip()
+        if coding == "gzip":
+            return q > 0
+        if coding == "*":
+            wildcard_q = q
+    return wildcard_q is not None and wildcard_q > 0
+
+
+class QValueGZipMiddleware(GZipMiddleware):
+    """GZipMiddleware that treats an explicit gzip;q=0 as a refusal."""
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and not _accepts_gzip(
+            Headers(scope=scope).get("accept-encoding", "")
+        ):
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
+
+# Compress larger responses; cached payloads below ship pre-compressed
+GZIP_MINIMUM_SIZE = 1024
+app.add_middleware(QValueGZipMiddleware, minimum_size=GZIP_MINIMUM_SIZE)
+
 # Application configuration
 current_dir = Path(__file__).parent
 tariff_service = TariffUpdateService()
 
 # Load product data from JSON file with fallback
 try:
-    with open(current_dir / "sample_data.json", "r") as file:
-        SAMPLE_DATA = json.load(file)
+    SAMPLE_DATA = orjson.loads((current_dir / "sample_data.json").read_bytes())
 except FileNotFoundError:
     # Fallback data for initial setup
     SAMPLE_DATA = {
@@ -66,6 +120,88 @@ except FileNotFoundError:
         ]
     }
 
+# Share of tariff cost passed to consumers when the caller doesn't specify one
+DEFAULT_PASS_THROUGH_RATE = 75.0
+
+# Predefined tariff scenarios (rates in percent)
+TARIFF_SCENARIOS = {
+    "current_rates": {
+        "Electronics": 2.5,
+        "Metals": 3.0,
+        "Agriculture": 5.0,
+        "Machinery": 2.0,
+        "Textiles": 8.0,
+        "Chemicals": 3.5,
+    },
+    "proposed_changes": {
+        "Electronics": 25.0,
+        "Metals": 10.0,
+        "Agriculture": 15.0,
+    },
+}
+
+# Pre-serialized payloads for static GET endpoints
+ROOT_JSON = orjson.dumps(
+    {"message": "Welcome to the Tariff Tracker API", "version": "1.0.0"}
+)
+SCENARIOS_JSON = orjson.dumps(TARIFF_SCENARIOS)
+
+# Lookup indexes and payloads derived from SAMPLE_DATA, keyed by HS code.
+# PRODUCTS_JSON and PRICE_HISTORY_JSON hold (raw, gzipped) pairs.
+PRODUCT_JSON_BY_HS = {}
+PRODUCTS_JSON = (b"[]", None)
+PRICE_HISTORY_JSON = {}
+
+
+def _precompress(content: bytes) -> Tuple[bytes, Optional[bytes]]:
+    """Pair JSON bytes with a gzipped copy if large enough to be compressed."""
+    if len(content) < GZIP_MINIMUM_SIZE:
+        return content, None
+    return content, gzip.compress(content, compresslevel=6)
+
+
+def _rebuild_indexes():
+    """Rebuild HS code indexes and cached JSON from the loaded SAMPLE_DATA."""
+    global PRODUCT_JSON_BY_HS, PRODUCTS_JSON, PRICE_HISTORY_JSON
+
+    PRODUCT_JSON_BY_HS = {
+        p["hs_code"]: orjson.dumps(p) for p in SAMPLE_DATA["products"]
+    }
+    PRODUCTS_JSON = _precompress(orjson.dumps(SAMPLE_DATA["products"]))
+
+    price_history = defaultdict(list)
+    for entry in SAMPLE_DATA.get("price_history", []):
+        price_history[entry["hs_code"]].append(entry)
+
+    # Only the last year of weekly data is ever served, so slice up front
+    PRICE_HISTORY_JSON = {
+        hs: _precompress(orjson.dumps(entries[-52:]))
+        for hs, entries in price_history.items()
+    }
+
+
+def _json_response(content: bytes) -> Response:
+    """Wrap pre-serialized JSON bytes in a response without re-encoding."""
+    return Response(content=content, media_type="application/json")
+
+
+def _precompressed_response(
+    payload: Tuple[bytes, Optional[bytes]], request: Request
+) -> Response:
+    """Serve a precompressed payload, gzipped if the client accepts it."""
+    content, gzipped = payload
+    if gzipped is None:
+        return _json_response(content)
+
+    headers = {"Vary": "Accept-Encoding"}
+    if _accepts_gzip(request.headers.get("accept-encoding", "")):
+        headers["Content-Encoding"] = "gzip"
+        content = gzipped
+    return Response(content=content, media_type="application/json", headers=headers)
+
+
+_rebuild_indexes()
+
 
 # Data Models
 class Product(BaseModel):
@@ -85,8 +221,12 @@ class Product(BaseModel):
 class TariffCalculation(BaseModel):
     """Input parameters for tariff impact calculations."""
 
+    # Extra fields are allowed: the frontend also sends the selected hs_code
+    model_config = ConfigDict(frozen=True)
+
     retail_price: float
-    retail_markup: float
+    # A markup of -100% or less would make the import cost undefined
+    retail_markup: float = Field(gt=-100)
     tariff_rate: float
     pass_through_rate: Optional[float] = None
     inventory_buffer: int = 0
@@ -103,30 +243,50 @@ class CalculationResult(BaseModel):
     price_increase_pct: float
 
 
+class TariffCalculationBatch(BaseModel):
+    """Input parameters for many tariff impact calculations at once."""
+
+    model_config = ConfigDict(frozen=True)
+
+    retail_price: List[float]
+    retail_markup: List[Annotated[float, Field(gt=-100)]]
+    tariff_rate: List[float]
+    pass_through_rate: Optional[List[float]] = None
+
+
+class CalculationBatchResult(BaseModel):
+    """Results of batched tariff impact analysis, one entry per input row."""
+
+    import_cost: List[float]
+    tariff_amount: List[float]
+    tariff_passed: List[float]
+    future_price: List[float]
+    tariff_tax_pct: List[float]
+    price_increase_pct: List[float]
+
+
 # API Endpoints
 @app.get("/")
 async def root():
-    return {"message": "Welcome to the Tariff Tracker API", "version": "1.0.0"}
+    return _json_response(ROOT_JSON)
 
 
-@app.get("/api/products", response_model=List[Product])
-async def get_products():
+@app.get("/api/products", responses={200: {"model": List[Product]}})
+async def get_products(request: Request):
     """Retrieve a list of products with their elasticity data."""
-    return SAMPLE_DATA["products"]
+    return _precompressed_response(PRODUCTS_JSON, request)
 
 
-@app.get("/api/products/{hs_code}")
+@app.get("/api/products/{hs_code}", responses={200: {"model": Product}})
 async def get_product(hs_code: str):
     """Retrieve a specific product by HS code."""
-    product = next(
-        (p for p in SAMPLE_DATA["products"] if p["hs_code"] == hs_code), None
-    )
+    product = PRODUCT_JSON_BY_HS.get(hs_code)
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
-    return product
+    return _json_response(product)
 
 
-@app.post("/api/calculate", response_model=CalculationResult)
+@app.post("/api/calculate", responses={200: {"model": CalculationResult}})
 async def calculate_tariff(calc: TariffCalculation):
     """
     Calculate the tariff impact on consumer prices.
@@ -134,73 +294,133 @@ async def calculate_tariff(calc: TariffCalculation):
     Uses economic modeling to estimate how tariff costs are passed through
     to consumers based on market dynamics and business practices.
     """
-    if calc.pass_through_rate is None:
-        calc.pass_through_rate = 75.0
+    pass_through_rate = (
+        DEFAULT_PASS_THROUGH_RATE
+        if calc.pass_through_rate is None
+        else calc.pass_through_rate
+    )
 
     # Core economic calculations
     import_cost = calc.retail_price / (1 + calc.retail_markup / 100)
     tariff_amount = import_cost * (calc.tariff_rate / 100)
-    tariff_passed = tariff_amount * (calc.pass_through_rate / 100)
+    tariff_passed = tariff_amount * (pass_through_rate / 100)
     future_price = calc.retail_price + tariff_passed
-    tariff_tax_pct = (tariff_amount / future_price) * 100 if future_price > 0 else 0
+    tariff_tax_pct = (tariff_amount / future_price) * 100 if future_price > 0 else 0.0
     price_increase_pct = (
-        (tariff_passed / calc.retail_price) * 100 if calc.retail_price > 0 else 0
+        (tariff_passed / calc.retail_price) * 100 if calc.retail_price > 0 else 0.0
     )
 
-    return CalculationResult(
-        import_cost=round(import_cost, 2),
-        tariff_amount=round(tariff_amount, 2),
-        tariff_passed=round(tariff_passed, 2),
-        future_price=round(future_price, 2),
-        tariff_tax_pct=round(tariff_tax_pct, 2),
-        price_increase_pct=round(price_increase_pct, 2),
+    # Return a plain dict so no result model is built or revalidated per call
+    return ORJSONResponse(
+        {
+            "import_cost": round(import_cost, 2),
+            "tariff_amount": round(tariff_amount, 2),
+            "tariff_passed": round(tariff_passed, 2),
+            "future_price": round(future_price, 2),
+            "tariff_tax_pct": round(tariff_tax_pct, 2),
+            "price_increase_pct": round(price_increase_pct, 2),
+        }
+    )
+
+
+@app.post("/api/calculate-batch", responses={200: {"model": CalculationBatchResult}})
+async def calculate_tariff_batch(batch: TariffCalculationBatch):
+    """
+    Calculate tariff impacts for many scenarios in a single request.
+
+    Applies the same model as /api/calculate element-wise over equal-length
+    input arrays, which keeps what-if sweeps to one round-trip.
+    """
+    retail_price = np.asarray(batch.retail_price, dtype=np.float64)
+    retail_markup = np.asarray(batch.retail_markup, dtype=np.float64)
+    tariff_rate = np.asarray(batch.tariff_rate, dtype=np.float64)
+    if batch.pass_through_rate is None:
+        pass_through_rate = np.full_like(retail_price, DEFAULT_PASS_THROUGH_RATE)
+    else:
+        pass_through_rate = np.asarray(batch.pass_through_rate, dtype=np.float64)
+
+    if not (
+        retail_price.shape
+        == retail_markup.shape
+        == tariff_rate.shape
+        == pass_through_rate.shape
+    ):
+        raise HTTPException(
+            status_code=422, detail="All input arrays must have the same length"
+        )
+
+    # Core economic calculations, vectorized over all rows
+    import_cost = retail_price / (1 + retail_markup / 100)
+    tariff_amount = import_cost * (tariff_rate / 100)
+    tariff_passed = tariff_amount * (pass_through_rate / 100)
+    future_price = retail_price + tariff_passed
+    tariff_tax_pct = (
+        np.divide(
+            tariff_amount,
+            future_price,
+            out=np.zeros_like(future_price),
+            where=future_price > 0,
+        )
+        * 100
+    )
+    price_increase_pct = (
+        np.divide(
+            tariff_passed,
+            retail_price,
+            out=np.zeros_like(retail_price),
+            where=retail_price > 0,
+        )
+        * 100
+    )
+
+    # Round with Python's round() so results match /api/calculate exactly;
+    # np.round scales before rounding and can differ by a cent
+    result = {
+        "import_cost": import_cost,
+        "tariff_amount": tariff_amount,
+        "tariff_passed": tariff_passed,
+        "future_price": future_price,
+        "tariff_tax_pct": tariff_tax_pct,
+        "price_increase_pct": price_increase_pct,
+    }
+    return _json_response(
+        orjson.dumps(
+            {
+                field: [round(x, 2) for x in values.tolist()]
+                for field, values in result.items()
+            }
+        )
     )
 
 
 @app.get("/api/price-history/{hs_code}")
-async def get_price_history(hs_code: str):
+async def get_price_history(hs_code: str, request: Request):
     """Retrieve historical price data for a product (last 52 weeks)."""
     if "price_history" not in SAMPLE_DATA:
         raise HTTPException(status_code=404, detail="Price history not available")
 
-    history = [p for p in SAMPLE_DATA["price_history"] if p["hs_code"] == hs_code]
+    history = PRICE_HISTORY_JSON.get(hs_code)
     if not history:
         raise HTTPException(status_code=404, detail="Price history not found")
 
-    # Return last year of weekly data
-    return history[-52:]
+    return _precompressed_response(history, request)
 
 
 @app.get("/api/tariff-scenarios")
 async def get_tariff_scenarios():
     """Retrieve predefined tariff scenarios."""
-    return {
-        "current_rates": {
-            "Electronics": 2.5,
-            "Metals": 3.0,
-            "Agriculture": 5.0,
-            "Machinery": 2.0,
-            "Textiles": 8.0,
-            "Chemicals": 3.5,
-        },
-        "proposed_changes": {
-            "Electronics": 25.0,
-            "Metals": 10.0,
-            "Agriculture": 15.0,
-        },
-    }
+    return _json_response(SCENARIOS_JSON)
 
 
-@app.post("/api/update-tariffs")
-async def update_tariff_rates():
-    """
-    Update current tariff rates from USITC HTS API.
+# State of the most recent background tariff update
+TARIFF_UPDATE_STATUS = {"status": "idle"}
 
-    Fetches the latest official tariff rates from the US International Trade
-    Commission and updates all products in the database.
-    """
-    global SAMPLE_DATA
 
+async def _run_tariff_update():
+    """Fetch USITC rates, update the data file and reload it into memory."""
+    global SAMPLE_DATA, TARIFF_UPDATE_STATUS
+
+    TARIFF_UPDATE_STATUS = {"status": "running"}
     try:
         result = await tariff_service.update_sample_data_tariffs(
             current_dir / "sample_data.json"
@@ -208,10 +428,11 @@ async def update_tariff_rates():
 
         if result["success"]:
             # Reload updated product data
-            with open(current_dir / "sample_data.json", "r") as file:
-                SAMPLE_DATA = json.load(file)
+            SAMPLE_DATA = orjson.loads((current_dir / "sample_data.json").read_bytes())
+            _rebuild_indexes()
 
-            return {
+            TARIFF_UPDATE_STATUS = {
+                "status": "completed",
                 "message": "Tariff rates updated successfully",
                 "updated_count": len(result["updated_products"]),
                 "failed_count": len(result["failed_products"]),
@@ -220,15 +441,41 @@ async def update_tariff_rates():
                 "failed_products": result["failed_products"],
             }
         else:
-            raise HTTPException(
-                status_code=500,
-                detail=f"Failed to update tariff rates: {result.get('error', 'Unknown error')}",
-            )
+            TARIFF_UPDATE_STATUS = {
+                "status": "failed",
+                "error": f"Failed to update tariff rates: {result.get('error', 'Unknown error')}",
+            }
 
     except Exception as e:
-        raise HTTPException(
-            status_code=500, detail=f"Error updating tariff rates: {str(e)}"
-        )
+        TARIFF_UPDATE_STATUS = {
+            "status": "failed",
+            "error": f"Error updating tariff rates: {str(e)}",
+        }
+
+
+@app.post("/api/update-tariffs", status_code=202)
+async def update_tariff_rates(background_tasks: BackgroundTasks):
+    """
+    Update current tariff rates from USITC HTS API.
+
+    Queues a background job that fetches the latest official tariff rates
+    from the US International Trade Commission and updates all products in
+    the database. Only one update runs at a time; poll
+    /api/update-tariffs/status for the outcome.
+    """
+    global TARIFF_UPDATE_STATUS
+
+    if TARIFF_UPDATE_STATUS["status"] not in ("queued", "running"):
+        TARIFF_UPDATE_STATUS = {"status": "queued"}
+        background_tasks.add_task(_run_tariff_update)
+
+    return TARIFF_UPDATE_STATUS
+
+
+@app.get("/api/update-tariffs/status")
+async def get_tariff_update_status():
+    """Retrieve the state and results of the most recent tariff update."""
+    return TARIFF_UPDATE_STATUS
 
 
 @app.get("/api/tariff-info/{hs_code}")
@@ -6,14 +6,43 @@ Provides integration with the US International Trade Commission (USITC)
 Harmonized Tariff Schedule database.
 """
 
-import json
+import asyncio
+import os
+import re
+import time
 import httpx
-from typing import Dict, List, Optional
+import ijson
+import orjson
+from typing import Dict, Optional, Tuple
 from pathlib import Path
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Duty rate strings that mean no tariff
+_FREE = frozenset({"FREE", "DUTY FREE", "0", "0.0"})
+
+# Ad valorem duty rate such as "2.5%" or "2.5"; specific (per-unit) rates
+# like "3.4¢/kg" and compound rates don't match
+_RATE_RE = re.compile(r"(\d+(?:\.\d+)?)\s*%?")
+
+
+class _AsyncByteReader:
+    """Adapt an httpx response byte stream to the async read() ijson expects."""
+
+    def __init__(self, response: httpx.Response):
+        self._chunks = response.aiter_bytes()
+
+    async def read(self, size: int = -1) -> bytes:
+        # ijson probes with read(0) to detect bytes vs str; don't consume a chunk
+        if size == 0:
+            return b""
+        # Otherwise chunk sizes are set by the transport; ijson accepts any length
+        try:
+            return await self._chunks.__anext__()
+        except StopAsyncIteration:
+            return b""
+
 
 class TariffUpdateService:
     """
@@ -28,34 +57,219 @@ class TariffUpdateService:
         self.usitc_hts_url = "https://www.usitc.gov/sites/default/files/tata/hts/hts_2024_basic_edition_json.json"
         self.timeout = 30.0
 
-    async def fetch_current_tariff_rates(self) -> Optional[Dict]:
+        # Shared client so repeat fetches reuse pooled HTTP/2 connections
+        self._client = httpx.AsyncClient(
+            timeout=self.timeout,
+            http2=True,
+            limits=httpx.Limits(max_keepalive_connections=10),
+        )
+
+        # Cached (fetched_at, hts_index), refreshed after _ttl seconds
+        self._cache: Optional[Tuple[float, Dict[str, float]]] = None
+        self._ttl = 3600.0
+        self._lock = asyncio.Lock()
+        # Counts finished refresh attempts so callers queued behind one share it
+        self._refresh_attempts = 0
+        # After a failed refresh, wait _retry_backoff seconds before trying again
+        self._retry_backoff = 60.0
+        self._retry_after = 0.0
+
+        # Memoized tariff info responses by HS code, cleared when the index changes
+        self._tariff_info: Dict[str, Dict] = {}
+        self._tariff_info_max = 4096
+
+        # Validators from the last full download, sent on revalidation
+        self._etag: Optional[str] = None
+        self._last_modified: Optional[str] = None
+
+    async def aclose(self) -> None:
+        """Close the shared HTTP client and its pooled connections."""
+        await self._client.aclose()
+
+    def _cache_is_fresh(self) -> bool:
+        """Check whether a cached HTS index exists and is within its TTL."""
+        return self._cache is not None and time.monotonic() - self._cache[0] < self._ttl
+
+    def _refresh_due(self) -> bool:
+        """Check whether the cache needs refreshing and no backoff is pending."""
+        return not self._cache_is_fresh() and time.monotonic() >= self._retry_after
+
+    async def fetch_current_tariff_rates(self) -> Optional[Dict[str, float]]:
         """
         Fetch current tariff rates from USITC HTS API.
 
+        The index is cached in memory for up to an hour, and concurrent callers
+        that find the cache stale share a single download, whether it succeeds
+        or fails. If a refresh fails, no new download is attempted for
+        _retry_backoff seconds and the previous index is served meanwhile.
+
+        Returns:
+            Dict mapping 6-digit HS code to tariff rate or None if no index
+            has ever been fetched successfully
+        """
+        if self._refresh_due():
+            attempt = self._refresh_attempts
+            async with self._lock:
+                # Skip if another caller refreshed, or tried to, while we waited
+                if self._refresh_due() and self._refresh_attempts == attempt:
+                    try:
+                        hts_index = await self._download_hts_index()
+                    finally:
+                        self._refresh_attempts += 1
+                    if hts_index is not None:
+                        if self._cache is None or hts_index is not self._cache[1]:
+                            self._tariff_info.clear()
+                        self._cache = (time.monotonic(), hts_index)
+                    else:
+                        self._retry_after = time.monotonic() + self._retry_backoff
+                        if self._cache is not None:
+                            logger.warning("HTS refresh failed; serving cached index")
+
+        return self._cache[1] if self._cache is not None else None
+
+    async def _download_hts_index(self) -> Optional[Dict[str, float]]:
+        """
+        Download the HTS database from USITC and index it while streaming.
+
+        When an index is already cached the request is conditional, and a
+        304 Not Modified reuses the cached index without downloading the body.
+
         Returns:
-            Dict containing HTS tariff data or None if fetch fails
+            Dict mapping 6-digit HS code to tariff rate or None if fetch fails
         """
+        headers = {}
+        if self._cache is not None:
+            if self._etag:
+                headers["If-None-Match"] = self._etag
+            if self._last_modified:
+                headers["If-Modified-Since"] = self._last_modified
+
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.get(self.usitc_hts_url)
+            async with self._client.stream(
+                "GET", self.usitc_hts_url, headers=headers
+            ) as response:
+                if response.status_code == 304 and self._cache is not None:
+                    return self._cache[1]
+
                 response.raise_for_status()
-                return response.json()
+                hts_index = await self._index_hts_stream(response)
+                self._etag = response.headers.get("ETag")
+                self._last_modified = response.headers.get("Last-Modified")
+                return hts_index
         except httpx.RequestError as e:
             logger.error(f"Network error fetching tariff data: {e}")
             return None
         except httpx.HTTPStatusError as e:
             logger.error(f"HTTP error fetching tariff data: {e}")
             return None
-        except json.JSONDecodeError as e:
+        except ijson.JSONError as e:
             logger.error(f"JSON decode error: {e}")
             return None
 
+    async def _index_hts_stream(self, response: httpx.Response) -> Dict[str, float]:
+        """
+        Build the HTS prefix index from a streamed response body.
+
+        Entries are parsed one at a time, so the full HTS document is never
+        held in memory.
+
+        Args:
+            response: Open USITC response whose body has not been read yet
+
+        Returns:
+            Dict mapping 6-digit HS code to the first parseable rate listed for it
+        """
+        index: Dict[str, float] = {}
+        reader = _AsyncByteReader(response)
+        async for item in ijson.items_async(reader, "data.item", use_float=True):
+            self._index_hts_item(index, item)
+        return index
+
+    @staticmethod
+    def _parse_duty_rate(rate) -> Optional[float]:
+        """
+        Parse a duty rate from an HTS entry into a percentage.
+
+        Args:
+            rate: Raw rate value, either numeric or a string like "2.5%" or "Free"
+
+        Returns:
+            Rate as percentage or None if it cannot be parsed
+        """
+        # Handle various rate formats
+        if isinstance(rate, (int, float)):
+            return float(rate)
+
+        rate_str = str(rate).strip().upper()
+        if rate_str in _FREE:
+            return 0.0
+
+        # Extract numeric value from percentage strings
+        match = _RATE_RE.fullmatch(rate_str)
+        return float(match.group(1)) if match else None
+
+    def _build_hts_index(self, hts_data: Dict) -> Dict[str, float]:
+        """
+        Build a lookup of tariff rates keyed by 6-digit HS code prefix.
+
+        Args:
+            hts_data: HTS database from USITC API
+
+        Returns:
+            Dict mapping 6-digit HS code to the first parseable rate listed for it
+        """
+        index: Dict[str, float] = {}
+        if not hts_data or "data" not in hts_data:
+            return index
+
+        for item in hts_data.get("data", []):
+            self._index_hts_item(index, item)
+
+        return index
+
+    @staticmethod
+    def _hts_item_prefix(item: Dict) -> str:
+        """Get the 6-digit HS code prefix of an HTS entry, or "" if too short."""
+        # Check various possible field names for HS codes
+        item_hs = item.get(
+            "hts_number", item.get("hs_code", item.get("product_code", ""))
+        )
+        # HTS numbers are dotted ("8517.13.00"); key on the bare digits
+        prefix = str(item_hs).replace(".", "")[:6]
+        return prefix if len(prefix) == 6 else ""
+
+    def _hts_item_rate(self, item: Dict) -> Optional[float]:
+        """Get the parsed duty rate of an HTS entry, or None if unparseable."""
+        # Extract tariff rate from common field names
+        return self._parse_duty_rate(
+            item.get("duty_rate", item.get("tariff_rate", item.get("rate", "0")))
+        )
+
+    def _index_hts_item(self, index: Dict[str, float], item: Dict) -> None:
+        """
+        Add a single HTS entry to a prefix index unless its code is already set.
+
+        Args:
+            index: Prefix index being built
+            item: One entry from the HTS data list
+        """
+        prefix = self._hts_item_prefix(item)
+        if not prefix or prefix in index:
+            return
+
+        rate = self._hts_item_rate(item)
+        if rate is not None:
+            index[prefix] = rate
+
     def find_tariff_rate_by_hs_code(
         self, hts_data: Dict, hs_code: str
     ) -> Optional[float]:
         """
         Find current tariff rate for a specific HS code.
 
+        Stops at the first matching entry with a valid rate; use
+        _build_hts_index instead when looking up many codes in the same data.
+
         Args:
             hts_data: HTS database from USITC API
             hs_code: 6-digit Harmonized System code
@@ -66,36 +280,13 @@ class TariffUpdateService:
         if not hts_data or "data" not in hts_data:
             return None
 
-        # Search through HTS data for matching HS code
+        prefix = hs_code[:6]
         for item in hts_data.get("data", []):
-            # Check various possible field names for HS codes
-            item_hs = item.get(
-                "hts_number", item.get("hs_code", item.get("product_code", ""))
-            )
-
-            # Match first 6 digits (standard HS code level)
-            if str(item_hs).startswith(hs_code[:6]):
-                # Extract tariff rate from common field names
-                rate_str = item.get(
-                    "duty_rate", item.get("tariff_rate", item.get("rate", "0"))
-                )
-
-                try:
-                    # Handle various rate formats
-                    if isinstance(rate_str, (int, float)):
-                        return float(rate_str)
-
-                    rate_str = str(rate_str).upper().strip()
-                    if rate_str in ["FREE", "DUTY FREE", "0"]:
-                        return 0.0
-
-                    # Extract numeric value from percentage strings
-                    if "%" in rate_str:
-                        rate_str = rate_str.replace("%", "").strip()
-
-                    return float(rate_str)
-                except (ValueError, TypeError):
-                    continue
+            # Only parse rates for matching entries
+            if self._hts_item_prefix(item) == prefix:
+                rate = self._hts_item_rate(item)
+                if rate is not None:
+                    return rate
 
         return None
 
@@ -118,16 +309,16 @@ class TariffUpdateService:
 
         try:
             # Load current product data
-            with open(sample_data_path, "r") as file:
-                data = json.load(file)
+            data = orjson.loads(sample_data_path.read_bytes())
 
             # Fetch latest tariff data from USITC
-            hts_data = await self.fetch_current_tariff_rates()
-            if not hts_data:
+            hts_index = await self.fetch_current_tariff_rates()
+            if hts_index is None:
                 result["error"] = "Failed to fetch tariff data from USITC"
                 return result
 
             # Update each product's current tariff rate
+            changed = False
             for product in data.get("products", []):
                 result["total_processed"] += 1
                 hs_code = product.get("hs_code")
@@ -142,10 +333,11 @@ class TariffUpdateService:
                     continue
 
                 # Find current official tariff rate
-                current_rate = self.find_tariff_rate_by_hs_code(hts_data, hs_code)
+                current_rate = hts_index.get(hs_code[:6])
 
                 if current_rate is not None:
                     old_rate = product.get("current_tariff_rate", 0)
+                    changed |= product.get("current_tariff_rate") != current_rate
                     product["current_tariff_rate"] = current_rate
 
                     result["updated_products"].append(
@@ -165,9 +357,13 @@ class TariffUpdateService:
                         }
                     )
 
-            # Save updated data back to file
-            with open(sample_data_path, "w") as file:
-                json.dump(data, file, indent=2)
+            # Save updated data back to file only if a rate actually moved.
+            # Write to a temp file and swap it in so readers never see a torn file.
+            # Output is minified since only the app reads it back.
+            if changed:
+                tmp_path = sample_data_path.with_suffix(".json.tmp")
+                tmp_path.write_bytes(orjson.dumps(data))
+                os.replace(tmp_path, sample_data_path)
 
             result["success"] = True
             return result
@@ -187,15 +383,21 @@ class TariffUpdateService:
         Returns:
             Dict with current tariff rate and metadata
         """
-        hts_data = await self.fetch_current_tariff_rates()
-        if not hts_data:
+        hts_index = await self.fetch_current_tariff_rates()
+        if hts_index is None:
             return {"error": "Failed to fetch tariff data"}
 
-        current_rate = self.find_tariff_rate_by_hs_code(hts_data, hs_code)
-
-        return {
-            "hs_code": hs_code,
-            "current_tariff_rate": current_rate,
-            "data_source": "USITC HTS 2024",
-            "last_updated": "2024",
-        }
+        info = self._tariff_info.get(hs_code)
+        if info is None:
+            info = {
+                "hs_code": hs_code,
+                "current_tariff_rate": hts_index.get(hs_code[:6]),
+                "data_source": "USITC HTS 2024",
+                "last_updated": "2024",
+            }
+            # Bound the memo, since hs_code comes straight from the request path
+            if len(self._tariff_info) < self._tariff_info_max:
+                self._tariff_info[hs_code] = info
+
+        # Hand out a copy so callers can't alter the memoized entry
+        return dict(info)
@@ -21,36 +21,35 @@ async def test_tariff_service():
 
     # Test fetching tariff data
     print("1. Fetching current tariff rates from USITC...")
-    hts_data = await service.fetch_current_tariff_rates()
+    hts_index = await service.fetch_current_tariff_rates()
 
-    if hts_data:
+    if hts_index is not None:
         print(f"✅ Successfully fetched HTS data")
-        print(
-            f"   Data structure keys: {list(hts_data.keys()) if isinstance(hts_data, dict) else 'Not a dict'}"
-        )
+        print(f"   Indexed HS codes: {len(hts_index)}")
 
-        # Test if we can find sample data
-        if isinstance(hts_data, dict) and "data" in hts_data:
-            sample_items = hts_data["data"][:3] if len(hts_data["data"]) > 0 else []
-            print(f"   Sample items ({len(sample_items)}):")
-            for item in sample_items:
-                print(f"     - {item}")
+        sample_items = list(hts_index.items())[:3]
+        print(f"   Sample items ({len(sample_items)}):")
+        for item in sample_items:
+            print(f"     - {item}")
 
     else:
         print("❌ Failed to fetch HTS data")
+        await service.aclose()
         return
 
     print("\n2. Testing HS code lookups...")
     test_codes = ["851712", "870323", "847130"]
 
     for hs_code in test_codes:
-        rate = service.find_tariff_rate_by_hs_code(hts_data, hs_code)
+        rate = hts_index.get(hs_code)
         print(f"   HS Code {hs_code}: {rate}% (or None if not found)")
 
     print("\n3. Testing individual product lookup...")
     product_info = await service.get_product_tariff_info("851712")
     print(f"   Product info for 851712: {json.dumps(product_info, indent=2)}")
 
+    await service.aclose()
+
 
 if __name__ == "__main__":
     asyncio.run(test_tariff_service())
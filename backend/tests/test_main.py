@@ -95,3 +95,176 @@ def test_get_tariff_scenarios():
     data = response.json()
     assert "current_rates" in data
     assert "proposed_changes" in data
+
+
+def test_get_price_history_returns_last_52_weeks(monkeypatch):
+    """Test price history is served from the precomputed last-52 slice"""
+    from app import main
+
+    history = [
+        {"hs_code": "851712", "week": week, "price": 800.0} for week in range(60)
+    ]
+    monkeypatch.setitem(main.SAMPLE_DATA, "price_history", history)
+    main._rebuild_indexes()
+    try:
+        response = client.get("/api/price-history/851712")
+        assert response.status_code == 200
+        data = response.json()
+        assert len(data) == 52
+        assert data[0]["week"] == 8
+
+        response = client.get("/api/price-history/999999")
+        assert response.status_code == 404
+    finally:
+        monkeypatch.undo()
+        main._rebuild_indexes()
+
+
+def test_calculate_tariff_batch_matches_single():
+    """Test batched calculation agrees with the single-item endpoint"""
+    rows = [
+        {"retail_price": 100.0, "retail_markup": 50.0, "tariff_rate": 10.0},
+        {"retail_price": 800.0, "retail_markup": 30.0, "tariff_rate": 34.0},
+        {"retail_price": 0.0, "retail_markup": 50.0, "tariff_rate": 25.0},
+        # 296.075 is where np.round and round() disagree by a cent
+        {"retail_price": 296.075, "retail_markup": 0.0, "tariff_rate": 0.0},
+    ]
+    batch = {key: [row[key] for row in rows] for key in rows[0]}
+
+    response = client.post("/api/calculate-batch", json=batch)
+    assert response.status_code == 200
+    data = response.json()
+
+    for i, row in enumerate(rows):
+        single = client.post("/api/calculate", json=row).json()
+        for field, value in single.items():
+            assert data[field][i] == value
+
+
+def test_calculate_rejects_markup_of_minus_100():
+    """Test both calculate endpoints reject a markup that zeroes the import cost"""
+    row = {"retail_price": 100.0, "retail_markup": -100.0, "tariff_rate": 10.0}
+    assert client.post("/api/calculate", json=row).status_code == 422
+
+    batch = {key: [value] for key, value in row.items()}
+    assert client.post("/api/calculate-batch", json=batch).status_code == 422
+
+
+def test_calculate_tariff_batch_length_mismatch():
+    """Test batched calculation rejects inputs of differing lengths"""
+    batch = {
+        "retail_price": [100.0, 200.0],
+        "retail_markup": [50.0],
+        "tariff_rate": [10.0, 10.0],
+    }
+    response = client.post("/api/calculate-batch", json=batch)
+    assert response.status_code == 422
+
+
+def test_calculate_tariff_accepts_frontend_payload():
+    """Test the calculator payload sent by the frontend, including hs_code"""
+    calculation_data = {
+        "retail_price": 100.0,
+        "retail_markup": 50.0,
+        "tariff_rate": 10.0,
+        "pass_through_rate": None,
+        "hs_code": "851712",
+    }
+
+    response = client.post("/api/calculate", json=calculation_data)
+    assert response.status_code == 200
+    assert response.json()["tariff_passed"] == 5.0
+
+
+def test_get_products_gzip():
+    """Test the product list is served gzipped only when the client accepts it"""
+    plain = client.get("/api/products", headers={"Accept-Encoding": "identity"})
+    assert plain.status_code == 200
+    assert "content-encoding" not in plain.headers
+
+    compressed = client.get("/api/products", headers={"Accept-Encoding": "gzip"})
+    assert compressed.status_code == 200
+    assert compressed.headers["content-encoding"] == "gzip"
+    assert compressed.headers["vary"] == "Accept-Encoding"
+    assert compressed.json() == plain.json()
+
+    refused = client.get("/api/products", headers={"Accept-Encoding": "gzip;q=0"})
+    assert refused.status_code == 200
+    assert "content-encoding" not in refused.headers
+
+    weighted = client.get(
+        "/api/products", headers={"Accept-Encoding": "gzip;q=0.5;foo=1"}
+    )
+    assert weighted.status_code == 200
+    assert weighted.headers["content-encoding"] == "gzip"
+
+
+def test_update_tariffs_runs_in_background(monkeypatch):
+    """Test tariff updates are accepted with 202 and reported via the status endpoint"""
+    from app import main
+
+    async def fake_update(sample_data_path):
+        return {
+            "success": True,
+            "updated_products": [{"name": "Smartphones", "hs_code": "851712"}],
+            "failed_products": [],
+            "total_processed": 1,
+        }
+
+    monkeypatch.setattr(main.tariff_service, "update_sample_data_tariffs", fake_update)
+    monkeypatch.setattr(main, "TARIFF_UPDATE_STATUS", {"status": "idle"})
+
+    response = client.post("/api/update-tariffs")
+    assert response.status_code == 202
+    assert response.json()["status"] == "queued"
+
+    # TestClient runs background tasks before returning the response
+    status = client.get("/api/update-tariffs/status").json()
+    assert status["status"] == "completed"
+    assert status["updated_count"] == 1
+
+
+def test_update_tariffs_reports_failure(monkeypatch):
+    """Test a failed background update is surfaced through the status endpoint"""
+    from app import main
+
+    async def fake_update(sample_data_path):
+        return {"success": False, "error": "Failed to fetch tariff data from USITC"}
+
+    monkeypatch.setattr(main.tariff_service, "update_sample_data_tariffs", fake_update)
+    monkeypatch.setattr(main, "TARIFF_UPDATE_STATUS", {"status": "idle"})
+
+    assert client.post("/api/update-tariffs").status_code == 202
+    status = client.get("/api/update-tariffs/status").json()
+    assert status["status"] == "failed"
+    assert "USITC" in status["error"]
+
+
+def test_update_tariffs_does_not_queue_twice(monkeypatch):
+    """Test a second update request while one is running is not queued again"""
+    from app import main
+
+    monkeypatch.setattr(main, "TARIFF_UPDATE_STATUS", {"status": "running"})
+
+    response = client.post("/api/update-tariffs")
+    assert response.status_code == 202
+    assert response.json()["status"] == "running"
+
+
+def test_gzip_middleware_honors_refusal():
+    """Test dynamic responses are not gzipped for clients that send gzip;q=0"""
+    batch = {
+        "retail_price": [100.0] * 200,
+        "retail_markup": [50.0] * 200,
+        "tariff_rate": [10.0] * 200,
+    }
+    compressed = client.post(
+        "/api/calculate-batch", json=batch, headers={"Accept-Encoding": "gzip"}
+    )
+    assert compressed.headers["content-encoding"] == "gzip"
+
+    refused = client.post(
+        "/api/calculate-batch", json=batch, headers={"Accept-Encoding": "gzip;q=0"}
+    )
+    assert "content-encoding" not in refused.headers
+    assert refused.json() == compressed.json()
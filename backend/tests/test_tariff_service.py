@@ -0,0 +1,265 @@
+"""
+Tests for the tariff update service (no network access required)
+"""
+
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from app.tariff_service import TariffUpdateService
+
+SAMPLE_HTS = {
+    "data": [
+        {"hts_number": "8517.13.00", "duty_rate": "Free"},
+        {"hts_number": "8703.23.01", "duty_rate": "N/A"},
+        {"hts_number": "8703.23.01.10", "duty_rate": "2.5%"},
+        {"hts_number": "8703.23.01.20", "duty_rate": "9%"},
+        {"hs_code": "640399", "tariff_rate": 37.5},
+        {"hts_number": "85", "duty_rate": "5%"},
+    ]
+}
+
+
+@pytest.fixture(scope="module")
+def service():
+    """Yield one shared service for the helper tests, closing its client after"""
+    svc = TariffUpdateService()
+    yield svc
+    asyncio.run(svc.aclose())
+
+
+@pytest.fixture
+def stub_service(monkeypatch):
+    """Yield a service whose HTS download is stubbed out and counted"""
+    stub = TariffUpdateService()
+    stub.download_calls = 0
+    # Indexes returned by successive downloads before falling back to SAMPLE_HTS
+    stub.queued_indexes = []
+    stub.fail_downloads = False
+
+    async def fake_download():
+        stub.download_calls += 1
+        await asyncio.sleep(0)
+        if stub.fail_downloads:
+            return None
+        if stub.queued_indexes:
+            return stub.queued_indexes.pop(0)
+        return stub._build_hts_index(SAMPLE_HTS)
+
+    monkeypatch.setattr(stub, "_download_hts_index", fake_download)
+    yield stub
+    asyncio.run(stub.aclose())
+
+
+def test_build_hts_index(service):
+    """Test the HTS index keys on 6-digit prefixes and keeps the first valid rate"""
+    index = service._build_hts_index(SAMPLE_HTS)
+    assert index == {"851713": 0.0, "870323": 2.5, "640399": 37.5}
+
+
+def test_build_hts_index_skips_blank_rates(service):
+    """Test a heading row with a blank rate doesn't hide the real rate below it"""
+    hts_data = {
+        "data": [
+            {"hts_number": "8703.23", "duty_rate": ""},
+            {"hts_number": "8703.23.01", "duty_rate": "2.5%"},
+        ]
+    }
+    assert service._build_hts_index(hts_data) == {"870323": 2.5}
+
+
+def test_build_hts_index_handles_missing_data(service):
+    """Test the HTS index is empty when no data is available"""
+    assert service._build_hts_index(None) == {}
+    assert service._build_hts_index({}) == {}
+
+
+def test_find_tariff_rate_by_hs_code(service):
+    """Test single-code lookups agree with the index"""
+    assert service.find_tariff_rate_by_hs_code(SAMPLE_HTS, "870323") == 2.5
+    assert service.find_tariff_rate_by_hs_code(SAMPLE_HTS, "999999") is None
+
+
+def test_index_hts_stream_matches_in_memory_index(service):
+    """Test streaming the HTS body builds the same index as parsing it whole"""
+    response = httpx.Response(200, content=json.dumps(SAMPLE_HTS).encode())
+    index = asyncio.run(service._index_hts_stream(response))
+    assert index == service._build_hts_index(SAMPLE_HTS)
+
+
+def test_hts_fetch_is_cached_and_single_flight(stub_service):
+    """Test concurrent lookups share one download and reuse it until the TTL expires"""
+
+    async def lookup_many():
+        return await asyncio.gather(
+            *(stub_service.get_product_tariff_info("870323") for _ in range(5))
+        )
+
+    results = asyncio.run(lookup_many())
+    assert stub_service.download_calls == 1
+    assert all(r["current_tariff_rate"] == 2.5 for r in results)
+
+    asyncio.run(stub_service.get_product_tariff_info("851713"))
+    assert stub_service.download_calls == 1
+
+    stub_service._ttl = 0
+    asyncio.run(stub_service.get_product_tariff_info("851713"))
+    assert stub_service.download_calls == 2
+
+
+def test_update_sample_data_tariffs(tmp_path, stub_service):
+    """Test product rates are updated from the HTS index and written back"""
+    sample_data_path = tmp_path / "sample_data.json"
+    products = [
+        {"name": "Cars", "hs_code": "870323", "current_tariff_rate": 0.0},
+        {"name": "Unknown code"},
+        {"name": "Footwear", "hs_code": "640399", "current_tariff_rate": 0.0},
+        {"name": "Widgets", "hs_code": "999999", "current_tariff_rate": 1.0},
+    ]
+    sample_data_path.write_text(json.dumps({"products": products}))
+
+    result = asyncio.run(stub_service.update_sample_data_tariffs(sample_data_path))
+    assert result["success"]
+    assert result["total_processed"] == 4
+    assert [p["hs_code"] for p in result["updated_products"]] == ["870323", "640399"]
+    assert [p["name"] for p in result["failed_products"]] == ["Unknown code", "Widgets"]
+
+    saved = json.loads(sample_data_path.read_text())["products"]
+    assert [p.get("current_tariff_rate") for p in saved] == [2.5, None, 37.5, 1.0]
+
+
+def test_update_sample_data_tariffs_skips_unchanged_write(tmp_path, stub_service):
+    """Test the data file is left untouched when no rate changes"""
+    sample_data_path = tmp_path / "sample_data.json"
+    original = json.dumps(
+        {
+            "products": [
+                {"name": "Cars", "hs_code": "870323", "current_tariff_rate": 2.5}
+            ]
+        }
+    )
+    sample_data_path.write_text(original)
+
+    result = asyncio.run(stub_service.update_sample_data_tariffs(sample_data_path))
+    assert result["success"]
+    assert len(result["updated_products"]) == 1
+    assert sample_data_path.read_text() == original
+    assert not (tmp_path / "sample_data.json.tmp").exists()
+
+
+def test_parse_duty_rate(service):
+    """Test duty rate parsing across the formats seen in HTS data"""
+    assert service._parse_duty_rate(4) == 4.0
+    assert service._parse_duty_rate(" free ") == 0.0
+    assert service._parse_duty_rate("Duty Free") == 0.0
+    assert service._parse_duty_rate("") is None
+    assert service._parse_duty_rate("6.5%") == 6.5
+    assert service._parse_duty_rate("6.5 %") == 6.5
+    assert service._parse_duty_rate("3.4¢/kg") is None
+    assert service._parse_duty_rate("$1.50/doz.") is None
+    assert service._parse_duty_rate("2.5% + 3¢/kg") is None
+    assert service._parse_duty_rate("See note") is None
+
+
+def test_hts_refetch_uses_conditional_request():
+    """Test an expired cache revalidates with ETag and reuses the index on 304"""
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        if request.headers.get("If-None-Match") == '"v1"':
+            return httpx.Response(304)
+        return httpx.Response(
+            200,
+            content=json.dumps(SAMPLE_HTS).encode(),
+            headers={"ETag": '"v1"', "Last-Modified": "Mon, 01 Jan 2024 00:00:00 GMT"},
+        )
+
+    async def fetch_twice():
+        conditional_service = TariffUpdateService()
+        await conditional_service.aclose()
+        conditional_service._client = httpx.AsyncClient(
+            transport=httpx.MockTransport(handler)
+        )
+        first = await conditional_service.fetch_current_tariff_rates()
+        conditional_service._ttl = 0
+        second = await conditional_service.fetch_current_tariff_rates()
+        await conditional_service.aclose()
+        return first, second
+
+    first, second = asyncio.run(fetch_twice())
+    assert first == {"851713": 0.0, "870323": 2.5, "640399": 37.5}
+    assert second is first
+    assert "If-None-Match" not in requests[0].headers
+    assert requests[1].headers["If-Modified-Since"] == "Mon, 01 Jan 2024 00:00:00 GMT"
+
+
+def test_tariff_info_memo_is_invalidated_on_refresh(stub_service):
+    """Test memoized tariff info is rebuilt once a new index is downloaded"""
+    stub_service.queued_indexes = [{"870323": 2.5}, {"870323": 27.5}]
+
+    first = asyncio.run(stub_service.get_product_tariff_info("870323"))
+    assert "870323" in stub_service._tariff_info
+
+    # Callers get their own copy of the memoized entry
+    first["current_tariff_rate"] = None
+    again = asyncio.run(stub_service.get_product_tariff_info("870323"))
+    assert again["current_tariff_rate"] == 2.5
+
+    stub_service._ttl = 0
+    refreshed = asyncio.run(stub_service.get_product_tariff_info("870323"))
+    assert refreshed["current_tariff_rate"] == 27.5
+
+
+def test_failed_hts_fetch_is_shared_by_waiting_callers(stub_service):
+    """Test concurrent lookups share one failed download instead of retrying in turn"""
+    stub_service.fail_downloads = True
+
+    async def lookup_many():
+        return await asyncio.gather(
+            *(stub_service.get_product_tariff_info("870323") for _ in range(5))
+        )
+
+    results = asyncio.run(lookup_many())
+    assert stub_service.download_calls == 1
+    assert all("error" in r for r in results)
+
+
+def test_failed_hts_refresh_serves_stale_index(stub_service):
+    """Test an expired index is still served when its refresh fails"""
+    asyncio.run(stub_service.fetch_current_tariff_rates())
+
+    stub_service._ttl = 0
+    stub_service.fail_downloads = True
+    info = asyncio.run(stub_service.get_product_tariff_info("870323"))
+    assert stub_service.download_calls == 2
+    assert info["current_tariff_rate"] == 2.5
+
+    # Later requests get the stale index without waiting on another download
+    for _ in range(3):
+        asyncio.run(stub_service.get_product_tariff_info("870323"))
+    assert stub_service.download_calls == 2
+
+    # Once the backoff passes, the next request retries
+    stub_service._retry_after = 0.0
+    asyncio.run(stub_service.get_product_tariff_info("870323"))
+    assert stub_service.download_calls == 3
+
+
+def test_update_sample_data_tariffs_uses_one_index(tmp_path, stub_service):
+    """Test every product in an update is resolved against a single HTS fetch"""
+    stub_service._ttl = 0
+    stub_service.queued_indexes = [{"870323": 2.5, "640399": 37.5}, {}]
+
+    sample_data_path = tmp_path / "sample_data.json"
+    products = [
+        {"name": "Cars", "hs_code": "870323"},
+        {"name": "Footwear", "hs_code": "640399"},
+    ]
+    sample_data_path.write_text(json.dumps({"products": products}))
+
+    result = asyncio.run(stub_service.update_sample_data_tariffs(sample_data_path))
+    assert stub_service.download_calls == 1
+    assert len(result["updated_products"]) == 2
@@ -151,15 +151,16 @@ class ApiService {
   /**
    * Update all product tariff rates from external USITC API
    *
-   * Triggers backend to fetch latest tariff rates from USITC and update
-   * all products in the database with current official rates.
+   * Queues a backend job that fetches the latest tariff rates from USITC and
+   * updates all products in the database with current official rates. The
+   * request returns immediately; poll getTariffUpdateStatus() for results.
    *
-   * @returns {Promise<Object>} Update results with success/failure counts
+   * @returns {Promise<Object>} Current update status
    * @throws {Error} Network or server errors
    *
    * @example
    * const result = await api.updateTariffRates();
-   * // Returns: { message: "...", updated_count: 8, failed_count: 2, ... }
+   * // Returns: { status: "queued" }
    */
   async updateTariffRates() {
     return this.fetchWithError(`${API_URL}/api/update-tariffs`, {
@@ -167,6 +168,20 @@ class ApiService {
     });
   }
 
+  /**
+   * Get the status of the most recent tariff rate update
+   *
+   * @returns {Promise<Object>} Update status, with results once completed
+   * @throws {Error} Network or server errors
+   *
+   * @example
+   * const status = await api.getTariffUpdateStatus();
+   * // Returns: { status: "completed", updated_count: 8, failed_count: 2, ... }
+   */
+  async getTariffUpdateStatus() {
+    return this.fetchWithError(`${API_URL}/api/update-tariffs/status`);
+  }
+
   /**
    * Get current tariff information for a specific HS code
    *